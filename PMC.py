@@ -8,7 +8,173 @@ Refer to D. Mohaddes, C.T. Chang, M. Ihme, "Thermodynamic cycle analysis of supe
 """
 
 import numpy as np
-from sympy import Symbol, nsolve
+from scipy.optimize import brentq
+
+STEFAN_BOLTZMANN = 5.670374419e-8 # Stefan-Boltzmann constant [W/m**2.K**4]
+
+# Numba is optional, without it the solver kernels run as plain NumPy. Compiled kernels
+# are cached in __pycache__ so only the first run pays the compilation cost.
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args,**kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Residual of the steady-state PMC problem (Eqs. 24a-e), x = (th_3x,th_3y,th_3b,th_S1,th_S2)
+@njit(cache=True)
+def residual(x,iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV):
+    th_3x,th_3y,th_3b,th_S1,th_S2 = x
+    
+    # Heat transfer through the matrix, common to Eqs. 24a and 24c
+    th_Sm = 0.5*(th_S1+th_S2)
+    conv = iota*(1.+delta*th_Sm*th_Sm*th_Sm)*(th_S2-th_S1)
+    # Radiation losses from the upstream and downstream faces, x**4 written as products
+    S1_2,S2_2,a_2,b_2 = th_S1*th_S1,th_S2*th_S2,th_3a*th_3a,th_4*th_4
+    rad1 = iota*delta*mu*(S1_2*S1_2 - a_2*a_2)
+    rad2 = iota*delta*mu*(S2_2*S2_2 - b_2*b_2)
+    
+    f1 = conv - rad1 - (th_3x-th_3a)
+    f2 = f/(f+1.)*(LHV/(cp*T0)) - (th_3y - th_3x) #local eq ratio (DON'T use beta here!!)
+    f3 = conv + rad2 - (th_3y-th_3b)
+    f4 = Delta1 - (th_S1 - th_3x)
+    f5 = Delta2 - (th_3b - th_S2)
+    return np.array([f1,f2,f3,f4,f5])
+
+# Analytic Jacobian of the residual, J[i,j] = d(f_i)/d(x_j), written into J in place.
+# The entries are scalars for a single solve, or rows of length N when J has shape (5,5,N).
+@njit(cache=True)
+def _fill_jacobian(J,x,iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV):
+    th_3x,th_3y,th_3b,th_S1,th_S2 = x
+    
+    th_Sm = 0.5*(th_S1+th_S2)
+    dconv = 1.5*delta*th_Sm*th_Sm*(th_S2-th_S1) # derivative of the (th_S1+th_S2)/2 term
+    k = 1.+delta*th_Sm*th_Sm*th_Sm
+    
+    J[0,0] = -1.
+    J[0,3] = iota*(dconv - k - 4.*delta*mu*th_S1*th_S1*th_S1)
+    J[0,4] = iota*(dconv + k)
+    J[1,0] = 1.
+    J[1,1] = -1.
+    J[2,1] = -1.
+    J[2,2] = 1.
+    J[2,3] = iota*(dconv - k)
+    J[2,4] = iota*(dconv + k + 4.*delta*mu*th_S2*th_S2*th_S2)
+    J[3,0] = 1.
+    J[3,3] = -1.
+    J[4,2] = -1.
+    J[4,4] = 1.
+
+@njit(cache=True)
+def jacobian(x,iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV):
+    J = np.zeros((5,5))
+    _fill_jacobian(J,x,iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV)
+    return J
+
+# Newton iteration for the 5x5 PMC system, returns the solution and a convergence flag
+@njit(cache=True)
+def newton5(x,params,tol=1e-6,maxit=50):
+    x = x.copy()
+    for _ in range(maxit):
+        F = residual(x,*params)
+        if np.max(np.abs(F)) < tol:
+            return x,True
+        J = jacobian(x,*params)
+        x += np.linalg.solve(J,-F)
+    return x,False
+
+# Plain Python version of a kernel, which broadcasts over arrays unlike the compiled one
+def _py_func(func):
+    return getattr(func,'py_func',func)
+
+# Residual for N independent PMC problems, X has shape (N,5) and parameters shape (N,)
+def residual_batch(X,*params):
+    return _py_func(residual)(X.T,*params).T
+
+# Jacobians for N independent PMC problems, shape (N,5,5)
+def jacobian_batch(X,*params):
+    J = np.zeros((5,5,X.shape[0]))
+    _py_func(_fill_jacobian)(J,X.T,*params)
+    return J.transpose(2,0,1)
+
+# Newton iteration for N independent PMC problems, solved together with batched LAPACK calls.
+# Only samples that have not yet converged are carried into the next iteration, samples whose
+# residual becomes non-finite are dropped and reported as not converged.
+def newton_batch(X,params,tol=1e-6,maxit=50):
+    X = X.copy()
+    converged = np.zeros(X.shape[0],dtype=bool)
+    idx = np.arange(X.shape[0])
+    for _ in range(maxit):
+        args = [p[idx] for p in params]
+        F = residual_batch(X[idx],*args)
+        done = np.max(np.abs(F),axis=1) < tol # False for NaN
+        converged[idx[done]] = True
+        active = ~done & np.isfinite(F).all(axis=1)
+        idx = idx[active]
+        if idx.size == 0:
+            break
+        J = jacobian_batch(X[idx],*[a[active] for a in args])
+        F = F[active]
+        try:
+            dX = np.linalg.solve(J,-F[...,None])[...,0]
+        except np.linalg.LinAlgError:
+            # A singular Jacobian fails the whole batched solve, so solve sample by sample
+            # and let the singular ones go to NaN and drop out on the next iteration
+            dX = np.full_like(F,np.nan)
+            for j in range(idx.size):
+                try:
+                    dX[j] = np.linalg.solve(J[j],-F[j])
+                except np.linalg.LinAlgError:
+                    pass
+        X[idx] += dX
+    return X,converged
+
+# Heating value per unit fuel mass, LHV for lean mixtures and LHV/(f/f_st) for rich ones.
+# Branch-free so that it applies elementwise to arrays of f in batched solves.
+def effective_LHV(f,f_st,LHV):
+    return LHV*(f_st/np.maximum(f,f_st))
+
+# Positive root of c*s**4 + s = K for c >= 0 and K > 0. h(s) = c*s**4 + s - K is increasing and
+# convex for s > 0, so Newton started from an upper bound (where h >= 0) decreases monotonically
+# onto the root without overshooting.
+def _quartic_root(c,K,maxit=50):
+    if c == 0.:
+        return K
+    s = min(K,(K/c)**0.25)
+    for _ in range(maxit):
+        ds = (c*s**4 + s - K)/(4.*c*s**3 + 1.)
+        s -= ds
+        if ds <= 1e-15*s: # stops on rounding noise too, where ds can turn slightly negative
+            break
+    return s
+
+# Bracketed solve of the PMC problem after eliminating th_3y, th_3x and th_3b.
+# Eqs. 24b,d,e give th_3y = th_3x + q, th_3x = th_S1 - Delta1 and th_3b = th_S2 + Delta2, and
+# the difference of Eqs. 24a and 24c gives th_S2 as a function of th_S1, leaving Eq. 24a as a
+# single equation in th_S1. The bracket runs from no preheating (th_3x = th_3a) to no
+# conduction through the matrix (th_S1 = th_S2), so roots outside it (e.g. very lean mixtures
+# with strong upstream radiation losses) raise ValueError.
+def solve_reduced(iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV):
+    q = f/(f+1.)*(LHV/(cp*T0))
+    c = iota*delta*mu
+    K0 = th_3a + q - Delta2 + c*(th_3a**4 + th_4**4)
+    
+    # Full solution vector for a given th_S1, satisfying all equations but Eq. 24a
+    def x_of(th_S1):
+        th_S2 = _quartic_root(c,K0 - c*th_S1**4)
+        th_3x = th_S1 - Delta1
+        return np.array([th_3x,th_3x+q,th_S2+Delta2,th_S1,th_S2])
+    
+    def g(th_S1):
+        return residual(x_of(th_S1),iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV)[0]
+    
+    lo = th_3a + Delta1
+    if K0 <= lo or g(lo) <= 0.:
+        raise ValueError('PMC problem has no solution with th_3x >= th_3a and th_S1 <= th_S2')
+    hi = _quartic_root(2.*c,K0)
+    
+    return x_of(brentq(g,lo,hi,xtol=1e-12))
 
 # Class for solving steady-state PMC problem with dimensional parameters
 class PMC:
@@ -22,6 +188,40 @@ class PMC:
         self.emissivity = PMCData.emissivity
         self.DeltaT_PH = PMCData.DeltaT_PH
         self.DeltaT_RC = PMCData.DeltaT_RC
+        
+        # Average of the upstream and downstream extinction coefficients, from Hsu & Powell,
+        # pore diameter in mm and K_R in m^-1
+        self._K_R = 1.5*(1.-self.voidFrac)*(1./(self.dp_upstr*1000.) + 1./(self.dp_dwnstr*1000.))
+        self._geom_mu = (3.*self.emissivity*self._K_R*(1.-self.voidFrac)*self.L)/16.
+    
+    # Solution temperatures T = (T3x,T3y,T3b,TS1,TS2) along the last axis, shape (5,) after run and
+    # shape + (5,) after run_batch. Each property gives a scalar after run and an array of the
+    # batch shape after run_batch.
+    @property
+    def T3x(self): #gas temperatures
+        return np.moveaxis(self.T,-1,0)[0]
+    
+    @property
+    def T3y(self):
+        return np.moveaxis(self.T,-1,0)[1]
+    
+    @property
+    def T3b(self):
+        return np.moveaxis(self.T,-1,0)[2]
+    
+    @property
+    def TS1(self): #solid temperatures
+        return np.moveaxis(self.T,-1,0)[3]
+    
+    @property
+    def TS2(self):
+        return np.moveaxis(self.T,-1,0)[4]
+    
+    # Non-dimensional groups (Eq. 26), only iota and delta depend on the run conditions
+    def _thermal_coeffs(self,cp,T0):
+        iota = self.lambda_eff/(self.massFlux*cp*self.L)
+        delta = (16.*STEFAN_BOLTZMANN*T0**3)/(3.*self._K_R*self.lambda_eff)
+        return iota,delta,self._geom_mu
        
     # Solve the PMC problem 
     def run(self,cp,T0,T3a,T4,f,f_st,LHV):
@@ -29,48 +229,61 @@ class PMC:
         th_3a = T3a/T0
         th_4 = T4/T0
         
-        K_R_1 = 3*(1.-self.voidFrac)/(self.dp_upstr*1000.) #from Hsu & Powell,
-        K_R_2 = 3*(1.-self.voidFrac)/(self.dp_dwnstr*1000.) # pore diameter in mm and K_R
-        K_R = np.average([K_R_1,K_R_2])                     # in m^-1
+        iota,delta,mu = self._thermal_coeffs(cp,T0)
         
-        iota = self.lambda_eff/(self.massFlux*cp*self.L)
-        delta = (16.*ct.stefan_boltzmann*T0**3)/(3.*K_R*self.lambda_eff)
-        mu = (3.*self.emissivity*K_R*(1.-self.voidFrac)*self.L)/16.
+        Delta1 = self.DeltaT_PH/T0
+        Delta2 = self.DeltaT_RC/T0
+            
+        LHV = effective_LHV(f,f_st,LHV)
         
-        print('iota =',iota,'delta =',delta,'mu =',mu)
+        x0 = np.array([(T3a+1000)/T3a,(T3a+1500)/T3a,
+                       (T3a+1000)/T3a,(T3a+1000)/T3a,
+                       (T3a+1000)/T3a])
+        params = (iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV)
+        try:
+            SOL,converged = newton5(x0,params)
+        except np.linalg.LinAlgError: # singular Jacobian
+            SOL,converged = x0,False
+        # Newton can fail or land on a non-physical root (e.g. negative temperatures) for
+        # rich mixtures, fall back to the bracketed solve of the reduced problem. Only a
+        # finite, positive Newton root is accepted, so this raises if that cannot bracket a root.
+        if not (converged and np.all(np.isfinite(SOL) & (SOL > 0.))):
+            SOL = solve_reduced(*params)
+        
+        self.T = SOL*T0 # return to dimensional units
+        return
+    
+    # Solve a batch of PMC problems, arguments may be arrays of any broadcastable shapes
+    # (e.g. a sweep over f or T4, or a meshgrid over both). The batch is solved flattened.
+    def run_batch(self,cp,T0,T3a,T4,f,f_st,LHV):
+        args = np.broadcast_arrays(*np.atleast_1d(cp,T0,T3a,T4,f,f_st,LHV))
+        shape = args[0].shape
+        cp,T0,T3a,T4,f,f_st,LHV = [a.ravel() for a in args]
+        
+        th_3a = T3a/T0
+        th_4 = T4/T0
+        
+        iota,delta,mu,_ = np.broadcast_arrays(*self._thermal_coeffs(cp,T0),T0)
         
         Delta1 = self.DeltaT_PH/T0
         Delta2 = self.DeltaT_RC/T0
-            
-        if f < f_st:
-            LHV = LHV #lean
-        else:
-            LHV = LHV/(f/f_st) #rich
         
-        th_3x = Symbol('THETA_3x')
-        th_3y = Symbol('THETA_3y')
-        th_3b = Symbol('THETA_3b')
-        th_S1 = Symbol('THETA_S1')
-        th_S2 = Symbol('THETA_S2')
+        LHV = effective_LHV(f,f_st,LHV)
         
-        f1 = iota*((1.+delta*((th_S1+th_S2)/2.)**3)*(th_S2-th_S1) - 
-                   delta*mu*(th_S1**4-th_3a**4)) - (th_3x-th_3a)
-        f2 = f/(f+1.)*(LHV/(cp*T0)) - (th_3y - th_3x) #local eq ratio (DON'T use beta here!!)
-        f3 = iota*((1.+delta*((th_S1+th_S2)/2.)**3)*(th_S2-th_S1) + 
-                   delta*mu*(th_S2**4-th_4**4)) - (th_3y-th_3b)
-        f4 = Delta1 - (th_S1 - th_3x)
-        f5 = Delta2 - (th_3b - th_S2)
+        X0 = np.column_stack([(T3a+1000)/T3a,(T3a+1500)/T3a,
+                              (T3a+1000)/T3a,(T3a+1000)/T3a,
+                              (T3a+1000)/T3a])
+        params = (iota,delta,mu,th_3a,th_4,Delta1,Delta2,f,cp,T0,LHV)
+        SOL,converged = newton_batch(X0,params)
+        # Same fallback as in run, sample by sample
+        for i in np.flatnonzero(~converged | ~(np.isfinite(SOL) & (SOL > 0.)).all(axis=1)):
+            SOL[i] = solve_reduced(*[p[i] for p in params])
         
-        SOL = nsolve((f1,f2,f3,f4,f5),(th_3x,th_3y,th_3b,th_S1,th_S2),\
-                     ((T3a+1000)/T3a,(T3a+1500)/T3a,\
-                      (T3a+1000)/T3a,(T3a+1000)/T3a,\
-                      (T3a+1000)/T3a),tol=1e-6)
-        SOL *= T0 # return to dimensional units
-        self.T3x,self.T3y,self.T3b = SOL[0],SOL[1],SOL[2] #gas temperatures
-        self.TS1,self.TS2 = SOL[3],SOL[4] #solid temperatures
+        self.T = (SOL*T0[:,None]).reshape(shape + (5,)) # return to dimensional units
         return
 
-# Class for solving steady-state PMC problem with non-dimensional parameters
+# Class for solving steady-state PMC problem with non-dimensional parameters,
+# the solve itself is shared with PMC
 class PMCNondim(PMC):
 
     def __init__(self,PMCData):
@@ -79,44 +292,7 @@ class PMCNondim(PMC):
         self.mu = PMCData.mu
         self.DeltaT_PH = PMCData.DeltaT_PH
         self.DeltaT_RC = PMCData.DeltaT_RC
-
-    # Solve the PMC problem 
-    def run(self,cp,T0,T3a,T4,f,f_st,LHV):
-        th_3a = T3a/T0
-        th_4 = T4/T0
-        
-        Delta1 = self.DeltaT_PH/T0
-        Delta2 = self.DeltaT_RC/T0
-        
-        if f < f_st:
-            LHV = LHV #lean
-        else:
-            LHV = LHV/(f/f_st) #rich
-        
-        th_3x = Symbol('THETA_3x')
-        th_3y = Symbol('THETA_3y')
-        th_3b = Symbol('THETA_3b')
-        th_S1 = Symbol('THETA_S1')
-        th_S2 = Symbol('THETA_S2')
-        
-        iota = self.iota
-        delta = self.delta
-        mu = self.mu
-
-        f1 = iota*((1.+delta*((th_S1+th_S2)/2.)**3)*(th_S2-th_S1) - 
-                   delta*mu*(th_S1**4-th_3a**4)) - (th_3x-th_3a)
-        f2 = f/(f+1.)*(LHV/(cp*T0)) - (th_3y - th_3x) #local eq ratio (DON'T use beta here!!)
-        f3 = iota*((1.+delta*((th_S1+th_S2)/2.)**3)*(th_S2-th_S1) + 
-                   delta*mu*(th_S2**4-th_4**4)) - (th_3y-th_3b)
-        f4 = Delta1 - (th_S1 - th_3x)
-        f5 = Delta2 - (th_3b - th_S2)
-        
-        SOL = nsolve((f1,f2,f3,f4,f5),(th_3x,th_3y,th_3b,th_S1,th_S2),\
-                     ((T3a+1000)/T3a,(T3a+1500)/T3a,\
-                      (T3a+1000)/T3a,(T3a+1000)/T3a,\
-                      (T3a+1000)/T3a),tol=1e-6)
-
-        SOL *= T0 # return to dimensional units
-        self.T3x,self.T3y,self.T3b = SOL[0],SOL[1],SOL[2] #gas temperatures
-        self.TS1,self.TS2 = SOL[3],SOL[4] #solid temperatures
-        return
+    
+    # Non-dimensional groups (Eq. 26) are given directly
+    def _thermal_coeffs(self,cp,T0):
+        return self.iota,self.delta,self.mu